@@ -36,8 +36,8 @@ from azure.storage.blob import BlobServiceClient
 from backend.reindex import (
     upload_to_blob_storage,
     trigger_index_update,
-    delete_all_blobs,
-    recreate_index,
+    close_clients,
+    empty_index,
 )
 
 bp = Blueprint("routes", __name__, static_folder="static", template_folder="static")
@@ -60,6 +60,10 @@ def create_app():
             app.cosmos_conversation_client = None
             raise e
 
+    @app.after_serving
+    async def shutdown():
+        await close_clients()
+
     return app
 
 
@@ -76,11 +80,11 @@ async def upload_file():
             raise ValueError("No file provided or file name is empty.")
         file = files["file"]
 
-        # Subir el archivo al blob storage
-        upload_to_blob_storage(file)
+        # Subir el archivo al blob storage (bloqueante, fuera del event loop)
+        await asyncio.to_thread(upload_to_blob_storage, file)
 
-        # Ejecutar el trigger del indexador
-        trigger_index_update()
+        # Ejecutar el trigger del indexador (bloqueante, fuera del event loop)
+        await asyncio.to_thread(trigger_index_update)
 
         return {
             "message": "File uploaded and search index updated successfully",
@@ -95,16 +99,15 @@ async def upload_file():
 @bp.route("/clear-vector", methods=["POST"])
 async def api_empty_index():
     """
-    Endpoint to clear the Azure Blob Storage container and recreate the Azure Cognitive Search index.
+    Endpoint to clear the Azure Blob Storage container and empty the Azure Cognitive Search index.
     """
     try:
-        delete_all_blobs()
-        recreate_index()
+        await empty_index()
 
         return (
             jsonify(
                 {
-                    "message": "Blobs deleted and the search index recreated successfully."
+                    "message": "Blobs deleted and the search index emptied successfully."
                 }
             ),
             200,
@@ -1,11 +1,27 @@
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
 from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import SearchIndex
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, ExponentialRetry
+from azure.storage.blob.aio import (
+    BlobServiceClient as AsyncBlobServiceClient,
+    ExponentialRetry as AsyncExponentialRetry,
+)
 from backend.settings import app_settings
+from collections import namedtuple
+from functools import lru_cache
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import requests
 import logging
+import asyncio
+import time
 from dotenv import load_dotenv
 import os
 
@@ -20,26 +36,155 @@ INDEXER_NAME = os.getenv("INDEXER_NAME")
 STORAGE_ACCOUNT_NAME = os.getenv("STORAGE_ACCOUNT_NAME")
 STORAGE_ACCOUNT_KEY = os.getenv("STORAGE_ACCOUNT_KEY")
 BLOB_CONTAINER_NAME = os.getenv("BLOB_CONTAINER_NAME")
+BLOB_DELETE_CONCURRENCY = int(os.getenv("BLOB_DELETE_CONCURRENCY", "8"))
+
+# Maximum number of documents accepted by a single Search indexing batch
+SEARCH_DELETE_BATCH_SIZE = 1000
+
+# Maximum number of sub-requests accepted by a single Blob Batch call
+BLOB_BATCH_SIZE = 256
+
+# Seconds to keep retrying container creation while Azure finishes deleting the old one.
+# The captured container settings only live for this call, so it waits as long as the
+# 230s gunicorn request timeout allows rather than asking for a re-run.
+CONTAINER_RECREATE_TIMEOUT = 200
+
+# Upload tuning: blobs above 4 MiB are sent as 8 MiB blocks, up to 8 blocks in parallel
+BLOB_MAX_SINGLE_PUT_SIZE = 4 * 1024 * 1024
+BLOB_MAX_BLOCK_SIZE = 8 * 1024 * 1024
+BLOB_UPLOAD_CONCURRENCY = 8
 
 # base URL
 SEARCH_ENDPOINT = f"https://{SEARCH_SERVICE_NAME}.search.windows.net"
 BLOB_ENDPOINT = f"https://{STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
 
-blob_service_client = BlobServiceClient(
-    account_url=BLOB_ENDPOINT, credential=STORAGE_ACCOUNT_KEY
+# Index schema: `id`, `name`, `content` and blob metadata populated by the indexer
+INDEX_FIELDS = [
+    {"name": "id", "type": "Edm.String", "key": True, "searchable": False},
+    {"name": "name", "type": "Edm.String", "searchable": True},
+    {"name": "content", "type": "Edm.String", "searchable": True},
+    {
+        "name": "metadata_storage_path",
+        "type": "Edm.String",
+        "searchable": False,
+    },  # Ruta del blob
+    {
+        "name": "metadata_storage_size",
+        "type": "Edm.Int64",
+        "searchable": False,
+    },  # Tamaño del archivo
+    {
+        "name": "metadata_storage_last_modified",
+        "type": "Edm.DateTimeOffset",
+        "searchable": False,
+    },  # Última modificación
+]
+_INDEX_SCHEMA = SearchIndex(name=INDEX_NAME, fields=INDEX_FIELDS)
+
+# Shared HTTP session for Search REST calls, so connections are kept alive between calls.
+# POST /run is not idempotent: a read timeout may mean the indexer already started, so only
+# connection errors and throttling/5xx status responses are retried.
+_search_session = requests.Session()
+_search_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=5,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False,
+        ),
+    ),
 )
 
+# Retry transient Blob Storage failures with exponential backoff (~1s, 3s, 5s, 9s, 17s)
+_blob_retry_policy = ExponentialRetry(initial_backoff=1, increment_base=2, retry_total=5)
+_async_blob_retry_policy = AsyncExponentialRetry(
+    initial_backoff=1, increment_base=2, retry_total=5
+)
+
+_AzureClients = namedtuple(
+    "_AzureClients",
+    [
+        "container_client",
+        "async_blob_service_client",
+        "async_container_client",
+        "index_client",
+        "search_client",
+    ],
+)
+
+
+@lru_cache(maxsize=1)
+def _clients():
+    """Builds the Azure SDK clients on first use and reuses them afterwards,
+    so importing this module does not pay for their pipeline setup.
+    """
+    blob_service_client = BlobServiceClient(
+        account_url=BLOB_ENDPOINT,
+        credential=STORAGE_ACCOUNT_KEY,
+        retry_policy=_blob_retry_policy,
+        max_single_put_size=BLOB_MAX_SINGLE_PUT_SIZE,
+        max_block_size=BLOB_MAX_BLOCK_SIZE,
+    )
+
+    # Async client shared by bulk operations; its aiohttp session is opened on first use
+    async_blob_service_client = AsyncBlobServiceClient(
+        account_url=BLOB_ENDPOINT,
+        credential=STORAGE_ACCOUNT_KEY,
+        retry_policy=_async_blob_retry_policy,
+    )
+
+    search_credential = AzureKeyCredential(ADMIN_KEY)
+    return _AzureClients(
+        container_client=blob_service_client.get_container_client(BLOB_CONTAINER_NAME),
+        async_blob_service_client=async_blob_service_client,
+        async_container_client=async_blob_service_client.get_container_client(
+            BLOB_CONTAINER_NAME
+        ),
+        index_client=SearchIndexClient(
+            endpoint=SEARCH_ENDPOINT, credential=search_credential
+        ),
+        search_client=SearchClient(
+            endpoint=SEARCH_ENDPOINT,
+            index_name=INDEX_NAME,
+            credential=search_credential,
+        ),
+    )
+
+
+async def close_clients():
+    """Closes the shared async Blob client and its aiohttp session, if it was ever built.
+    Meant to run once when the app stops serving.
+    """
+    if _clients.cache_info().currsize:
+        await _clients().async_blob_service_client.close()
+        _clients.cache_clear()
+
 
 def upload_to_blob_storage(file):
     """Sube el archivo a Azure Blob Storage."""
     try:
-        blob_client = blob_service_client.get_blob_client(
-            container=BLOB_CONTAINER_NAME, blob=file.filename
+        start = time.perf_counter()
+        blob_client = _clients().container_client.get_blob_client(file.filename)
+        blob_client.upload_blob(
+            file.stream,
+            blob_type="BlockBlob",
+            length=file.content_length or None,
+            overwrite=True,
+            max_concurrency=BLOB_UPLOAD_CONCURRENCY,
+        )
+        logging.info(
+            "File %s successfully uploaded to Blob Storage in %.2fs.",
+            file.filename,
+            time.perf_counter() - start,
         )
-        blob_client.upload_blob(file.stream, overwrite=True)
-        logging.info(f"File {file.filename} successfully uploaded to Blob Storage.")
     except Exception as e:
-        logging.error(f"Failed to upload file to Blob Storage: {str(e)}")
+        logging.error("Failed to upload file to Blob Storage: %s", e)
         raise
 
 
@@ -48,7 +193,7 @@ def trigger_index_update():
     try:
         url = f"{SEARCH_ENDPOINT}/indexers/{INDEXER_NAME}/run?api-version=2020-06-30"
         headers = {"Content-Type": "application/json", "api-key": ADMIN_KEY}
-        response = requests.post(url, headers=headers)
+        response = _search_session.post(url, headers=headers, timeout=(3.05, 30))
 
         if response.status_code != 202:
             raise ValueError(
@@ -57,28 +202,184 @@ def trigger_index_update():
 
         logging.info("Indexer triggered successfully.")
     except Exception as e:
-        logging.error(f"Failed to trigger index update: {str(e)}")
+        logging.error("Failed to trigger index update: %s", e)
+        raise
+
+
+def _chunked(iterable, size):
+    """Yields successive lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def _recreate_container(async_container_client):
+    """Drops the blob container and creates it again with the same metadata, public access
+    level and stored access policies. Azure keeps the name reserved while the old container
+    is being deleted, so creation is retried with backoff until it succeeds or
+    `CONTAINER_RECREATE_TIMEOUT` seconds have passed, after which the error is raised.
+    If another caller recreates the container first, the captured settings are applied
+    to it. Returns False, without touching the container, if Azure refuses to drop it
+    (e.g. it holds a lease), so the caller can delete its blobs instead.
+    """
+    try:
+        properties = await async_container_client.get_container_properties()
+        access_policy = await async_container_client.get_container_access_policy()
+    except ResourceNotFoundError:
+        # Also returned while a previous drop is still in progress: the settings are gone
+        properties, access_policy = None, None
+        logging.warning(
+            "Container %s was not found, so its metadata, public access level and stored "
+            "access policies could not be captured; it will be recreated without them",
+            BLOB_CONTAINER_NAME,
+        )
+    else:
+        try:
+            await async_container_client.delete_container()
+        except ResourceNotFoundError:
+            pass
+        except HttpResponseError as e:
+            logging.warning(
+                "Container %s could not be dropped: %s", BLOB_CONTAINER_NAME, e
+            )
+            return False
+
+    metadata = properties.metadata if properties else None
+    public_access = access_policy["public_access"] if access_policy else None
+    signed_identifiers = {
+        identifier.id: identifier.access_policy
+        for identifier in (access_policy["signed_identifiers"] if access_policy else [])
+    }
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CONTAINER_RECREATE_TIMEOUT
+    delay = 1
+    created = False
+    while not created:
+        try:
+            await async_container_client.create_container(
+                metadata=metadata, public_access=public_access
+            )
+            created = True
+        except ResourceExistsError as e:
+            if e.error_code == "ContainerAlreadyExists":
+                break
+            if loop.time() + delay > deadline:
+                logging.error(
+                    "Container %s is still being deleted after %ds. Once Azure releases "
+                    "the name, recreate it with metadata=%s, public_access=%s and "
+                    "stored access policies %s",
+                    BLOB_CONTAINER_NAME,
+                    CONTAINER_RECREATE_TIMEOUT,
+                    metadata,
+                    public_access,
+                    list(signed_identifiers),
+                )
+                raise
+            logging.debug(
+                "Container %s is still being deleted, retrying in %ds",
+                BLOB_CONTAINER_NAME,
+                delay,
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+
+    # A container created by someone else lacks the settings captured here
+    if not created and metadata:
+        await async_container_client.set_container_metadata(metadata=metadata)
+    if signed_identifiers or (access_policy and not created):
+        await async_container_client.set_container_access_policy(
+            signed_identifiers=signed_identifiers, public_access=public_access
+        )
+    return True
+
+
+async def _delete_batch(async_container_client, semaphore, blob_names):
+    """Deletes `blob_names` with a single Blob Batch request, once `semaphore` allows it.
+    Blobs that are already gone (404) count as deleted; other failures are logged.
+    Returns the number of blobs deleted.
+    """
+    async with semaphore:
+        try:
+            responses = await async_container_client.delete_blobs(
+                *blob_names, raise_on_any_failure=False
+            )
+            failed = [r async for r in responses if r.status_code not in (202, 404)]
+            if failed:
+                logging.error(
+                    "Failed to delete %d of %d blobs in batch",
+                    len(failed),
+                    len(blob_names),
+                )
+            return len(blob_names) - len(failed)
+        except Exception as e:
+            logging.error("Failed to delete batch of %d blobs: %s", len(blob_names), e)
+            return 0
+
+
+async def _delete_listed_blobs(async_container_client, prefix=None):
+    """Deletes the blobs whose names start with `prefix` (all blobs when None).
+    Each listing page is split into Blob Batch requests of up to `BLOB_BATCH_SIZE` deletes,
+    with up to `BLOB_DELETE_CONCURRENCY` batches in flight.
+    Returns the number of blobs deleted.
+    """
+    semaphore = asyncio.Semaphore(BLOB_DELETE_CONCURRENCY)
+
+    # Dispatch each listing page as soon as it arrives, so deletes overlap with listing
+    tasks = []
+    try:
+        pages = async_container_client.list_blob_names(name_starts_with=prefix).by_page()
+        async for page in pages:
+            blob_names = [name async for name in page]
+            tasks.extend(
+                asyncio.create_task(
+                    _delete_batch(async_container_client, semaphore, chunk)
+                )
+                for chunk in _chunked(blob_names, BLOB_BATCH_SIZE)
+            )
+    except BaseException:
+        # Don't leave deletes running in the background once the caller sees the failure
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         raise
+    return sum(await asyncio.gather(*tasks))
 
 
-def delete_all_blobs():
+async def delete_all_blobs(prefix=None):
     """Deletes all blobs from the specified Azure Blob Storage container.
-    Iterates through the blobs in the container and removes them one by one.
+    Without a `prefix` the container itself is dropped and recreated, which is a single
+    control-plane call regardless of the number of blobs; if Azure refuses to drop it, its
+    blobs are batch-deleted instead. With a `prefix` only matching blobs are batch-deleted.
+    A failed batch is logged and does not abort the rest.
+    Returns the number of blobs deleted, or None when the whole container was recreated.
     """
     try:
-        blob_service_client = BlobServiceClient(
-            account_url=BLOB_ENDPOINT, credential=STORAGE_ACCOUNT_KEY
+        async_container_client = _clients().async_container_client
+        start = time.perf_counter()
+
+        if prefix is None:
+            if await _recreate_container(async_container_client):
+                logging.info(
+                    "Recreated container %s in %.2fs",
+                    BLOB_CONTAINER_NAME,
+                    time.perf_counter() - start,
+                )
+                return None
+            logging.info("Deleting blobs of container %s instead", BLOB_CONTAINER_NAME)
+
+        deleted = await _delete_listed_blobs(async_container_client, prefix)
+        logging.info(
+            "Deleted %d blobs with prefix '%s' from container %s in %.2fs",
+            deleted,
+            prefix or "",
+            BLOB_CONTAINER_NAME,
+            time.perf_counter() - start,
         )
-        container_client = blob_service_client.get_container_client(BLOB_CONTAINER_NAME)
-
-        logging.debug(f"Deleting blobs from container: {BLOB_CONTAINER_NAME}")
-        blob_list = container_client.list_blobs()
-        for blob in blob_list:
-            logging.debug(f"Deleting blob: {blob.name}")
-            container_client.delete_blob(blob.name)
-        logging.debug("All blobs have been successfully deleted.")
+        return deleted
     except Exception as e:
-        logging.error(f"Error while deleting blobs: {e}")
+        logging.error("Error while deleting blobs: %s", e)
+        raise
 
 
 def recreate_index():
@@ -87,55 +388,128 @@ def recreate_index():
     and metadata like storage path, size, and last modification date.
     """
     try:
-        index_client = SearchIndexClient(
-            endpoint=SEARCH_ENDPOINT, credential=AzureKeyCredential(ADMIN_KEY)
-        )
+        index_client = _clients().index_client
 
         # If exists, delete the index
-        if INDEX_NAME in [idx.name for idx in index_client.list_indexes()]:
+        try:
             index_client.delete_index(INDEX_NAME)
+        except ResourceNotFoundError:
+            pass
 
         # Create a new index
-        logging.debug(f"Creating index: {INDEX_NAME}")
-        fields = [
-            {"name": "id", "type": "Edm.String", "key": True, "searchable": False},
-            {"name": "name", "type": "Edm.String", "searchable": True},
-            {"name": "content", "type": "Edm.String", "searchable": True},
-            {
-                "name": "metadata_storage_path",
-                "type": "Edm.String",
-                "searchable": False,
-            },  # Ruta del blob
-            {
-                "name": "metadata_storage_size",
-                "type": "Edm.Int64",
-                "searchable": False,
-            },  # Tamaño del archivo
-            {
-                "name": "metadata_storage_last_modified",
-                "type": "Edm.DateTimeOffset",
-                "searchable": False,
-            },  # Última modificación
-        ]
-        index = SearchIndex(name=INDEX_NAME, fields=fields)
-        index_client.create_index(index)
+        logging.debug("Creating index: %s", INDEX_NAME)
+        index_client.create_index(_INDEX_SCHEMA)
         logging.debug("Index successfully created.")
     except Exception as e:
-        logging.error(f"Error while recreating the index: {e}")
+        logging.error("Error while recreating the index: %s", e)
+        raise
+
+
+def _id_greater_than(last_id):
+    """Builds the OData filter selecting documents whose key sorts after `last_id`."""
+    if last_id is None:
+        return None
+    escaped_id = last_id.replace("'", "''")
+    return f"id gt '{escaped_id}'"
 
 
-def empty_index():
-    """Clears the Azure Blob Storage container and recreates the index in Azure Cognitive Search.
-    Combines the functionality of `delete_all_blobs` and `recreate_index`.
+def clear_index_documents():
+    """Deletes every document from the search index while keeping the index itself.
+    Pages through document keys in `id` order, `SEARCH_DELETE_BATCH_SIZE` at a time, each
+    page starting after the last key seen. Every key is fetched and deleted exactly once,
+    even while deleted documents are still visible to search, and the service's 100,000
+    result skip limit does not apply.
+    Returns the number of documents deleted.
     """
     try:
-        # Delete all blob from Azure Container
-        logging.info("STARTING INDEX REMOVAL...")
-        delete_all_blobs()
+        start = time.perf_counter()
+        search_client = _clients().search_client
+        deleted = 0
+        last_id = None
+        while True:
+            results = search_client.search(
+                "*",
+                select=["id"],
+                filter=_id_greater_than(last_id),
+                order_by=["id"],
+                top=SEARCH_DELETE_BATCH_SIZE,
+            )
+            document_ids = [doc["id"] for doc in results]
+            if not document_ids:
+                break
+            last_id = document_ids[-1]
+
+            indexing_results = search_client.delete_documents(
+                documents=[{"id": doc_id} for doc_id in document_ids]
+            )
+            failed = [r.key for r in indexing_results if not r.succeeded]
+            if failed:
+                raise ValueError(
+                    f"Failed to delete {len(failed)} documents, e.g. {failed[:10]}"
+                )
+            deleted += len(document_ids)
 
-        # Recreate the index using Azure Search
-        recreate_index()
+        logging.info(
+            "Deleted %d documents from index %s in %.2fs",
+            deleted,
+            INDEX_NAME,
+            time.perf_counter() - start,
+        )
+        return deleted
+    except Exception as e:
+        logging.error("Failed to clear index documents: %s", e)
+        raise
+
+
+def _index_schema_matches(index):
+    """Checks whether an existing index has exactly the fields defined in `INDEX_FIELDS`."""
+    current = {
+        (field.name, field.type, bool(field.key), bool(field.searchable))
+        for field in index.fields
+    }
+    desired = {
+        (field["name"], field["type"], field.get("key", False), field["searchable"])
+        for field in INDEX_FIELDS
+    }
+    return current == desired
+
+
+def reset_index():
+    """Empties the search index, rebuilding it only when needed.
+    If the index exists with the expected schema its documents are deleted and the index
+    is kept warm; otherwise it is dropped and created again through `recreate_index`.
+    """
+    try:
+        try:
+            index = _clients().index_client.get_index(INDEX_NAME)
+        except ResourceNotFoundError:
+            index = None
+
+        if index is not None and _index_schema_matches(index):
+            clear_index_documents()
+        else:
+            recreate_index()
+    except Exception as e:
+        logging.error("Error while resetting the index: %s", e)
+        raise
+
+
+async def empty_index():
+    """Clears the Azure Blob Storage container and empties the index in Azure Cognitive Search.
+    Combines the functionality of `delete_all_blobs` and `reset_index`; the two target
+    independent services, so they run concurrently.
+    Returns the number of blobs deleted, as reported by `delete_all_blobs`.
+    """
+    try:
+        logging.info("STARTING INDEX REMOVAL...")
+        deleted_count, _ = await asyncio.gather(
+            # Delete all blob from Azure Container
+            delete_all_blobs(),
+            # Empty the index using Azure Search
+            asyncio.to_thread(reset_index),
+        )
         logging.info("INDEX EMPTIED SUCCESSFULLY.")
+        return deleted_count
     except Exception as e:
-        logging.error(f"Error in empty_index: {e}")
+        logging.error("Error in empty_index: %s", e)
         raise
@@ -0,0 +1,364 @@
+import asyncio
+import os
+import re
+import pytest
+from importlib import import_module, reload
+from unittest.mock import AsyncMock, MagicMock
+
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
+from azure.search.documents.indexes.models import SearchField, SearchIndex
+
+
+@pytest.fixture(scope="module")
+def reindex():
+    # backend.reindex reads the Azure Search datasource settings at import time
+    os.environ["DOTENV_PATH"] = os.path.join(
+        os.path.dirname(__file__),
+        "dotenv_data",
+        "dotenv_with_azure_search_success"
+    )
+    reload(import_module("backend.settings"))
+    yield reload(import_module("backend.reindex"))
+
+
+@pytest.fixture(scope="function")
+def clients(reindex, monkeypatch):
+    clients = reindex._AzureClients(
+        container_client=MagicMock(),
+        async_blob_service_client=MagicMock(),
+        async_container_client=MagicMock(),
+        index_client=MagicMock(),
+        search_client=MagicMock(),
+    )
+    monkeypatch.setattr(reindex, "_clients", lambda: clients)
+    return clients
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def _blob_response(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    return response
+
+
+def _container_being_deleted():
+    error = ResourceExistsError("The specified container is being deleted.")
+    error.error_code = "ContainerBeingDeleted"
+    return error
+
+
+def _search_index(fields):
+    return SearchIndex(
+        name="search_index",
+        fields=[
+            SearchField(
+                name=field["name"],
+                type=field["type"],
+                key=field.get("key", False),
+                searchable=field["searchable"],
+            )
+            for field in fields
+        ],
+    )
+
+
+def _indexing_result(key, succeeded=True):
+    result = MagicMock()
+    result.key = key
+    result.succeeded = succeeded
+    return result
+
+
+def test_index_schema_matches(reindex):
+    assert reindex._index_schema_matches(_search_index(reindex.INDEX_FIELDS))
+
+
+def test_index_schema_drifted(reindex):
+    missing_field = reindex.INDEX_FIELDS[:-1]
+    changed_type = [
+        {**field, "type": "Edm.Int32"} if field["name"] == "metadata_storage_size" else field
+        for field in reindex.INDEX_FIELDS
+    ]
+    assert not reindex._index_schema_matches(_search_index(missing_field))
+    assert not reindex._index_schema_matches(_search_index(changed_type))
+
+
+def test_reset_index_clears_documents(reindex, clients):
+    clients.index_client.get_index.return_value = _search_index(reindex.INDEX_FIELDS)
+    clients.search_client.search.side_effect = [[{"id": "1"}, {"id": "2"}], []]
+    clients.search_client.delete_documents.return_value = [
+        _indexing_result("1"), _indexing_result("2")
+    ]
+
+    reindex.reset_index()
+
+    clients.search_client.delete_documents.assert_called_once_with(
+        documents=[{"id": "1"}, {"id": "2"}]
+    )
+    clients.index_client.delete_index.assert_not_called()
+    clients.index_client.create_index.assert_not_called()
+
+
+@pytest.mark.parametrize("existing_index", ["missing", "drifted"])
+def test_reset_index_recreates_index(reindex, clients, existing_index):
+    if existing_index == "missing":
+        clients.index_client.get_index.side_effect = ResourceNotFoundError("not found")
+    else:
+        clients.index_client.get_index.return_value = _search_index(reindex.INDEX_FIELDS[:2])
+
+    reindex.reset_index()
+
+    clients.index_client.delete_index.assert_called_once_with(reindex.INDEX_NAME)
+    clients.index_client.create_index.assert_called_once_with(reindex._INDEX_SCHEMA)
+    clients.search_client.delete_documents.assert_not_called()
+
+
+class _LaggingSearchIndex:
+    """Fake search service where deleted documents stay visible to search, like an index
+    that has not refreshed yet. Only supports the key-paging queries used by the module."""
+
+    def __init__(self, document_ids):
+        self.document_ids = sorted(document_ids)
+        self.deleted = []
+
+    def search(self, search_text, select, filter, order_by, top):
+        assert (search_text, select, order_by) == ("*", ["id"], ["id"])
+        last_id = None
+        if filter is not None:
+            last_id = re.fullmatch(r"id gt '(.*)'", filter).group(1).replace("''", "'")
+        return [
+            {"id": doc_id}
+            for doc_id in self.document_ids
+            if last_id is None or doc_id > last_id
+        ][:top]
+
+    def delete_documents(self, documents):
+        self.deleted.extend(doc["id"] for doc in documents)
+        return [_indexing_result(doc["id"]) for doc in documents]
+
+
+def test_clear_index_documents_pages_by_key(reindex, clients, monkeypatch):
+    document_ids = [f"doc{i:04}" for i in range(2500)] + ["it's"]
+    search_index = _LaggingSearchIndex(document_ids)
+    monkeypatch.setattr(
+        reindex, "_clients", lambda: clients._replace(search_client=search_index)
+    )
+
+    # Deleted keys are still searchable, yet each one is fetched and deleted once
+    assert reindex.clear_index_documents() == 2501
+    assert sorted(search_index.deleted) == sorted(document_ids)
+
+
+def test_id_greater_than(reindex):
+    assert reindex._id_greater_than(None) is None
+    assert reindex._id_greater_than("doc1") == "id gt 'doc1'"
+    assert reindex._id_greater_than("it's") == "id gt 'it''s'"
+
+
+def test_clear_index_documents_failed_delete(reindex, clients):
+    clients.search_client.search.side_effect = [[{"id": "1"}], [{"id": "1"}]]
+    clients.search_client.delete_documents.return_value = [_indexing_result("1", False)]
+
+    with pytest.raises(ValueError):
+        reindex.clear_index_documents()
+
+
+@pytest.mark.asyncio
+async def test_delete_batch_counts_responses(reindex):
+    container_client = MagicMock()
+    container_client.delete_blobs = AsyncMock(
+        return_value=_aiter([_blob_response(code) for code in (202, 202, 404, 409, 500)])
+    )
+
+    deleted = await reindex._delete_batch(
+        container_client, asyncio.Semaphore(1), ["a", "b", "c", "d", "e"]
+    )
+
+    # 404 means the blob was already gone; 409 and 500 are failures
+    assert deleted == 3
+    container_client.delete_blobs.assert_awaited_once_with(
+        "a", "b", "c", "d", "e", raise_on_any_failure=False
+    )
+
+
+@pytest.mark.asyncio
+async def test_delete_batch_request_error(reindex):
+    container_client = MagicMock()
+    container_client.delete_blobs = AsyncMock(side_effect=HttpResponseError("boom"))
+
+    assert await reindex._delete_batch(container_client, asyncio.Semaphore(1), ["a"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_all_blobs_with_prefix(reindex, clients):
+    pages = MagicMock()
+    pages.by_page.return_value = _aiter([_aiter(["a", "b"]), _aiter(["c"])])
+    container_client = clients.async_container_client
+    container_client.list_blob_names.return_value = pages
+    container_client.delete_blobs = AsyncMock(
+        side_effect=lambda *names, **kwargs: _aiter(_blob_response(202) for _ in names)
+    )
+
+    assert await reindex.delete_all_blobs(prefix="docs/") == 3
+    container_client.list_blob_names.assert_called_once_with(name_starts_with="docs/")
+
+
+@pytest.mark.asyncio
+async def test_delete_all_blobs_listing_failure_stops_pending_deletes(reindex, clients):
+    async def failing_pages():
+        yield _aiter(["a", "b"])
+        raise HttpResponseError("listing failed")
+
+    async def slow_delete(*names, **kwargs):
+        await asyncio.Event().wait()
+
+    pages = MagicMock()
+    pages.by_page.return_value = failing_pages()
+    container_client = clients.async_container_client
+    container_client.list_blob_names.return_value = pages
+    container_client.delete_blobs = AsyncMock(side_effect=slow_delete)
+
+    with pytest.raises(HttpResponseError, match="listing failed"):
+        await reindex.delete_all_blobs(prefix="docs/")
+
+    # No batch delete is left running once the failure is reported
+    pending = asyncio.all_tasks() - {asyncio.current_task()}
+    assert not pending
+
+
+@pytest.fixture(scope="function")
+def container_client(clients, monkeypatch, reindex):
+    monkeypatch.setattr(reindex.asyncio, "sleep", AsyncMock())
+    container_client = clients.async_container_client
+    properties = MagicMock()
+    properties.metadata = {"owner": "team"}
+    identifier = MagicMock()
+    identifier.id = "read-only"
+    container_client.get_container_properties = AsyncMock(return_value=properties)
+    container_client.get_container_access_policy = AsyncMock(
+        return_value={"public_access": "blob", "signed_identifiers": [identifier]}
+    )
+    container_client.delete_container = AsyncMock()
+    container_client.create_container = AsyncMock()
+    container_client.set_container_access_policy = AsyncMock()
+    container_client.set_container_metadata = AsyncMock()
+    return container_client
+
+
+@pytest.mark.asyncio
+async def test_recreate_container_retries_while_being_deleted(reindex, container_client):
+    container_client.create_container.side_effect = [
+        _container_being_deleted(), _container_being_deleted(), None
+    ]
+
+    assert await reindex.delete_all_blobs() is None
+
+    container_client.delete_container.assert_awaited_once()
+    assert container_client.create_container.await_count == 3
+    container_client.create_container.assert_awaited_with(
+        metadata={"owner": "team"}, public_access="blob"
+    )
+    assert [c.args for c in reindex.asyncio.sleep.await_args_list] == [(1,), (2,)]
+    identifier = container_client.get_container_access_policy.return_value[
+        "signed_identifiers"
+    ][0]
+    container_client.set_container_access_policy.assert_awaited_once_with(
+        signed_identifiers={"read-only": identifier.access_policy}, public_access="blob"
+    )
+
+
+@pytest.mark.asyncio
+async def test_recreate_container_timeout(
+    reindex, container_client, monkeypatch, caplog
+):
+    monkeypatch.setattr(reindex, "CONTAINER_RECREATE_TIMEOUT", 0)
+    container_client.create_container.side_effect = _container_being_deleted()
+
+    with pytest.raises(ResourceExistsError):
+        await reindex.delete_all_blobs()
+    container_client.set_container_access_policy.assert_not_awaited()
+    # The log carries the captured settings so they can be restored by hand
+    assert "metadata={'owner': 'team'}" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_recreate_container_without_captured_settings(
+    reindex, container_client, caplog
+):
+    # A previous drop is still in progress: Azure answers 404 to everything but create
+    container_client.get_container_properties.side_effect = ResourceNotFoundError(
+        "The specified container is being deleted."
+    )
+    container_client.create_container.side_effect = [_container_being_deleted(), None]
+
+    assert await reindex.delete_all_blobs() is None
+
+    assert "recreated without them" in caplog.text
+    container_client.delete_container.assert_not_awaited()
+    container_client.create_container.assert_awaited_with(
+        metadata=None, public_access=None
+    )
+    container_client.set_container_access_policy.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_recreate_container_created_by_another_caller(reindex, container_client):
+    already_exists = ResourceExistsError("The specified container already exists.")
+    already_exists.error_code = "ContainerAlreadyExists"
+    container_client.create_container.side_effect = [
+        _container_being_deleted(), already_exists
+    ]
+
+    assert await reindex.delete_all_blobs() is None
+
+    # The captured settings are applied to the container the other caller created
+    container_client.set_container_metadata.assert_awaited_once_with(
+        metadata={"owner": "team"}
+    )
+    identifier = container_client.get_container_access_policy.return_value[
+        "signed_identifiers"
+    ][0]
+    container_client.set_container_access_policy.assert_awaited_once_with(
+        signed_identifiers={"read-only": identifier.access_policy}, public_access="blob"
+    )
+
+
+@pytest.mark.asyncio
+async def test_recreate_container_falls_back_to_batch_delete(reindex, container_client):
+    container_client.delete_container.side_effect = HttpResponseError("lease present")
+    pages = MagicMock()
+    pages.by_page.return_value = _aiter([_aiter(["a", "b"])])
+    container_client.list_blob_names.return_value = pages
+    container_client.delete_blobs = AsyncMock(
+        return_value=_aiter([_blob_response(202), _blob_response(202)])
+    )
+
+    assert await reindex.delete_all_blobs() == 2
+    container_client.create_container.assert_not_awaited()
+    container_client.list_blob_names.assert_called_once_with(name_starts_with=None)
+
+
+@pytest.mark.asyncio
+async def test_empty_index_propagates_search_failure(reindex, clients, container_client):
+    clients.index_client.get_index.side_effect = HttpResponseError("search is down")
+
+    with pytest.raises(HttpResponseError, match="search is down"):
+        await reindex.empty_index()
+
+
+@pytest.mark.asyncio
+async def test_empty_index_propagates_blob_failure(reindex, clients, container_client):
+    clients.index_client.get_index.return_value = _search_index(reindex.INDEX_FIELDS)
+    clients.search_client.search.return_value = []
+    container_client.get_container_properties.side_effect = HttpResponseError("blob is down")
+
+    with pytest.raises(HttpResponseError, match="blob is down"):
+        await reindex.empty_index()